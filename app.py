@@ -1,246 +1,136 @@
 import streamlit as st
 import streamlit.components.v1 as components
-import yaml
-from datetime import datetime
-import markdown
-from bs4 import BeautifulSoup
-import re
+from datetime import date
+from functools import partial
+from pathlib import Path
+
+from utils import (
+    RENDER_POOL,
+    TAG_RE,
+    article_figure,
+    cover_figure,
+    generate_frontmatter,
+    parse_unsplash_html,
+    render_blocks,
+    slugify
+)
+
+EDITOR_COMPONENT = components.declare_component(
+    'markdown_editor', path=str(Path(__file__).parent / 'frontend' / 'editor')
+)
+PREVIEW_COMPONENT = components.declare_component(
+    'markdown_preview', path=str(Path(__file__).parent / 'frontend' / 'preview')
+)
+
+# Callables are called per session so each one gets fresh lists and today's date
+SESSION_DEFAULTS = {
+    # Appends go to the list; get_content() joins it only when read
+    'content_chunks': lambda: [''],
+    # Bumped whenever Python changes the content behind the editor's back
+    'content_revision': 0,
+    'editor_seq': None,
+    'image_dialog': None,
+    'block_cache': dict,
+    # Last rendered content and its blocks, reused while the content is unchanged
+    'preview_content': '',
+    'preview_result': list,
+    # Frontmatter fields are kept flat; the nested dict is only built for export
+    'fm_title': '',
+    'fm_excerpt': '',
+    'fm_publish_date': lambda: date.today().isoformat(),
+    'fm_tags': list,
+    'fm_image_src': '',
+    'fm_image_alt': ''
+}
 
 def init_session_state():
     """Initialize session state variables"""
-    if 'content' not in st.session_state:
-        st.session_state.content = ''
-    if 'frontmatter' not in st.session_state:
-        st.session_state.frontmatter = {
-            'title': '',
-            'excerpt': '',
-            'publishDate': datetime.now().strftime('%Y-%m-%d'),
-            'tags': [],
-            'seo': {'image': {'src': '', 'alt': ''}}
-        }
-
-def parse_unsplash_html(html_content):
-    """Parse Unsplash HTML and extract relevant information"""
-    try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        img = soup.find('img')
-        links = soup.find_all('a')
-        
-        if not (img and len(links) >= 2):
-            return None
-
-        utm_params = '?utm_content=creditCopyText&utm_medium=referral&utm_source=unsplash'
-        
-        return {
-            'src': img['src'],
-            'alt': img.get('alt', ''),
-            'photographer': links[0].text,
-            'photographer_url': links[0]['href'] + ('' if '?' in links[0]['href'] else utm_params),
-            'source_url': links[1]['href'] + ('' if '?' in links[1]['href'] else utm_params)
-        }
-    except Exception:
-        return None
-
-def convert_markdown(content):
-    """Convert markdown to HTML with proper formatting"""
+    # Only the first run of a session builds the defaults
+    if 'initialized' in st.session_state:
+        return
+    
+    for key, value in SESSION_DEFAULTS.items():
+        st.session_state.setdefault(key, value() if callable(value) else value)
+    st.session_state.initialized = True
+
+def get_content():
+    """Return the post content, joining pending chunks once"""
+    chunks = st.session_state.content_chunks
+    if len(chunks) > 1:
+        chunks[:] = [''.join(chunks)]
+    return chunks[0]
+
+def start_preview_render():
+    """Start rendering the current content while the rest of the page is built"""
+    state = st.session_state
+    pending = state.pop('preview_render', None)
+    if pending:
+        # An interrupted run can leave its render unawaited; finish it before
+        # starting another on the same block cache
+        rendered, future = pending
+        if not future.cancel() and not future.exception():
+            state.preview_result = future.result()
+            state.preview_content = rendered
+    
+    content = get_content()
+    if content != state.preview_content:
+        future = RENDER_POOL.submit(render_blocks, content, state.block_cache)
+        state.preview_render = (content, future)
+
+def preview_blocks():
+    """Return the preview blocks, rendering only when the content has changed"""
+    state = st.session_state
+    content = get_content()
     try:
-        extensions = [
-            'markdown.extensions.extra',
-            'markdown.extensions.nl2br',
-            'markdown.extensions.sane_lists',
-            'markdown.extensions.smarty'
-        ]
-        
-        html = markdown.markdown(content, extensions=extensions)
-        soup = BeautifulSoup(html, 'html.parser')
-        
-        # Process figures if they exist
-        for figure in soup.find_all('figure'):
-            if figure.figcaption:
-                caption_html = str(figure.figcaption).replace('&lt;', '<').replace('&gt;', '>')
-                figure.figcaption.replace_with(BeautifulSoup(caption_html, 'html.parser').figcaption)
-        
-        return str(soup)
+        pending = state.pop('preview_render', None)
+        if pending:
+            # Always wait; start_preview_render also waits for any render an
+            # interrupted run left behind, so two never share the block cache
+            rendered, future = pending
+            state.preview_result = future.result()
+            state.preview_content = rendered
+        if content != state.preview_content:
+            state.preview_result = render_blocks(content, state.block_cache)
+            state.preview_content = content
+        return state.preview_result
     except Exception as e:
         st.error(f"Error converting markdown: {str(e)}")
-        return content
+        return [content]
+
+def session_frontmatter():
+    """Generate the frontmatter block from the session state fields"""
+    return generate_frontmatter(
+        st.session_state.fm_title,
+        st.session_state.fm_excerpt,
+        st.session_state.fm_publish_date,
+        tuple(st.session_state.fm_tags),
+        st.session_state.fm_image_src,
+        st.session_state.fm_image_alt
+    )
 
 def create_editor():
     """Create the custom editor component with toolbar"""
-    editor_html = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            .editor-container {
-                display: flex;
-                flex-direction: column;
-                gap: 10px;
-                font-family: system-ui, -apple-system, sans-serif;
-            }
-            .toolbar {
-                display: flex;
-                flex-wrap: wrap;
-                gap: 5px;
-                padding: 5px;
-                background: #f5f5f5;
-                border: 1px solid #ddd;
-                border-radius: 4px;
-            }
-            .toolbar-group {
-                display: flex;
-                gap: 5px;
-                padding: 0 5px;
-                border-right: 1px solid #ddd;
-            }
-            button {
-                padding: 5px 10px;
-                background: white;
-                border: 1px solid #ddd;
-                border-radius: 4px;
-                cursor: pointer;
-                font-size: 14px;
-            }
-            button:hover {
-                background: #f0f0f0;
-            }
-            #editor {
-                width: 100%;
-                height: 600px;
-                padding: 10px;
-                font-family: 'Monaco', 'Menlo', monospace;
-                font-size: 14px;
-                line-height: 1.5;
-                border: 1px solid #ddd;
-                border-radius: 4px;
-                resize: vertical;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="editor-container">
-            <div class="toolbar">
-                <div class="toolbar-group">
-                    <button onclick="insertHeading(1)" title="Heading 1">H1</button>
-                    <button onclick="insertHeading(2)" title="Heading 2">H2</button>
-                    <button onclick="insertHeading(3)" title="Heading 3">H3</button>
-                </div>
-                <div class="toolbar-group">
-                    <button onclick="insertFormat('bold')" title="Bold">B</button>
-                    <button onclick="insertFormat('italic')" title="Italic">I</button>
-                    <button onclick="insertFormat('code')" title="Code">`</button>
-                </div>
-                <div class="toolbar-group">
-                    <button onclick="insertList('unordered')" title="Bullet List">•</button>
-                    <button onclick="insertList('ordered')" title="Numbered List">1.</button>
-                    <button onclick="insertLink()" title="Insert Link">🔗</button>
-                </div>
-                <div class="toolbar-group">
-                    <button onclick="insertImage('cover')" title="Cover Image">🖼️</button>
-                    <button onclick="insertImage('article')" title="Article Image">📊</button>
-                </div>
-            </div>
-            <textarea id="editor" spellcheck="true">{st.session_state.content}</textarea>
-        </div>
-
-        <script>
-            const editor = document.getElementById('editor');
-            
-            editor.addEventListener('input', () => {
-                window.parent.postMessage({
-                    type: 'streamlit:setComponentValue',
-                    data: editor.value
-                }, '*');
-            });
-
-            function getSelection() {
-                return {
-                    text: editor.value.substring(editor.selectionStart, editor.selectionEnd),
-                    start: editor.selectionStart,
-                    end: editor.selectionEnd
-                };
-            }
-
-            function insertAtCursor(text) {
-                const { start, end } = getSelection();
-                editor.value = editor.value.substring(0, start) + 
-                             text + 
-                             editor.value.substring(end);
-                
-                editor.focus();
-                const newPos = start + text.length;
-                editor.setSelectionRange(newPos, newPos);
-                editor.dispatchEvent(new Event('input'));
-            }
-
-            function insertHeading(level) {
-                const { text } = getSelection();
-                const prefix = '#'.repeat(level) + ' ';
-                insertAtCursor(text ? prefix + text + '\\n' : prefix);
-            }
-
-            function insertFormat(type) {
-                const { text } = getSelection();
-                let formatted = '';
-                
-                switch(type) {
-                    case 'bold':
-                        formatted = `**${text || 'bold text'}**`;
-                        break;
-                    case 'italic':
-                        formatted = `*${text || 'italic text'}*`;
-                        break;
-                    case 'code':
-                        formatted = text.includes('\\n') 
-                            ? `\`\`\`\\n${text || 'code'}\\n\`\`\`` 
-                            : `\`${text || 'code'}\``;
-                        break;
-                }
-                
-                insertAtCursor(formatted);
-            }
-
-            function insertList(type) {
-                const { text } = getSelection();
-                let formatted = '';
-                
-                if (text) {
-                    const lines = text.split('\\n');
-                    formatted = lines
-                        .filter(line => line.trim())
-                        .map((line, i) => type === 'ordered' 
-                            ? `${i + 1}. ${line}` 
-                            : `- ${line}`)
-                        .join('\\n') + '\\n';
-                } else {
-                    formatted = type === 'ordered' ? '1. ' : '- ';
-                }
-                
-                insertAtCursor(formatted);
-            }
-
-            function insertLink() {
-                const { text } = getSelection();
-                const url = prompt('Enter URL:');
-                if (url) {
-                    const linkText = text || prompt('Enter link text:') || 'link text';
-                    insertAtCursor(`[${linkText}](${url})`);
-                }
-            }
-
-            function insertImage(type) {
-                const dialogType = type === 'cover' ? 'cover-image' : 'article-image';
-                window.parent.postMessage({
-                    type: 'streamlit:setComponentValue',
-                    data: { dialog: dialogType }
-                }, '*');
-            }
-        </script>
-    </body>
-    </html>
-    """
+    value = EDITOR_COMPONENT(
+        content=get_content(),
+        revision=st.session_state.content_revision,
+        key='editor',
+        default=None
+    )
     
-    return components.html(editor_html, height=700)
+    # The component keeps returning its last value, so only apply new ones
+    if value and value['seq'] != st.session_state.editor_seq:
+        st.session_state.editor_seq = value['seq']
+        # In place, so an export callable holding the list sees the edit
+        st.session_state.content_chunks[:] = [value['content']]
+        if value.get('dialog'):
+            st.session_state.image_dialog = value['dialog']
+            st.rerun()
+
+def insert_figure(figure):
+    """Append a figure to the content and push it to the editor"""
+    st.session_state.content_chunks.append(figure)
+    st.session_state.content_revision += 1
+    st.session_state.image_dialog = None
 
 def show_image_dialog(image_type):
     """Show dialog for adding images"""
@@ -252,16 +142,9 @@ def show_image_dialog(image_type):
             if html:
                 data = parse_unsplash_html(html)
                 if data:
-                    figure = f"""<figure>
-  <img id="cover-img" src="{data['src']}" alt="{data['alt']}">
-  <figcaption>Photo by <a href="{data['photographer_url']}">{data['photographer']}</a> on <a href="{data['source_url']}">Unsplash</a></figcaption>
-</figure>\n\n"""
-                    
-                    st.session_state.content += figure
-                    st.session_state.frontmatter['seo']['image'].update({
-                        'src': data['src'],
-                        'alt': data['alt']
-                    })
+                    insert_figure(cover_figure(data))
+                    st.session_state.fm_image_src = data['src']
+                    st.session_state.fm_image_alt = data['alt']
                     st.rerun()
         
         else:  # article image
@@ -274,19 +157,38 @@ def show_image_dialog(image_type):
             author = st.text_input("Author (optional)")
             
             if st.button("Insert") and all([path, alt, caption, source, url]):
-                author_text = f", by {author}" if author else ""
-                figure = f"""<figure>
-  <img id="article-img" src="{path}" alt="{alt}">
-  <figcaption>"{caption}" \\ Source: <a href="{url}" target="_blank">{source}</a>{author_text}</figcaption>
-</figure>\n\n"""
-                
-                st.session_state.content += figure
+                insert_figure(article_figure(path, alt, caption, source, url, author))
                 st.rerun()
 
+@st.fragment
+def editor_and_preview():
+    """Editor and live preview, rerun on their own when the editor changes"""
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        create_editor()
+
+    with col2:
+        st.markdown("### Preview")
+        # The preview iframe only patches the blocks whose HTML changed
+        PREVIEW_COMPONENT(
+            blocks=preview_blocks(),
+            key='preview',
+            default=None
+        )
+
+def export_post(frontmatter, chunks):
+    """Assemble the exported post, called when the export button is clicked"""
+    # Runs on a worker thread without the session, so it only gets plain values
+    return f"""{frontmatter}
+{''.join(chunks)}"""
+
 def main():
     """Main application function"""
     st.set_page_config(layout="wide", page_title="Markdown Blog Editor", page_icon="📝")
     init_session_state()
+    # pyromark releases the GIL, so this overlaps with the widget code below
+    start_preview_render()
 
     # Title bar
     st.title("📝 Markdown Blog Editor")
@@ -294,38 +196,31 @@ def main():
     col1, col2, col3 = st.columns([3, 1, 1])
     
     with col1:
-        title = st.text_input("Post Title", value=st.session_state.frontmatter['title'])
-        if title != st.session_state.frontmatter['title']:
-            st.session_state.frontmatter['title'] = title
+        title = st.text_input("Post Title", value=st.session_state.fm_title)
+        if title != st.session_state.fm_title:
+            st.session_state.fm_title = title
             
     with col2:
         tags = st.text_input(
             "Tags (comma-separated)", 
-            value=','.join(st.session_state.frontmatter.get('tags', []))
+            value=','.join(st.session_state.fm_tags)
         )
-        st.session_state.frontmatter['tags'] = [
-            tag.strip() for tag in tags.split(',') if tag.strip()
-        ]
+        st.session_state.fm_tags = TAG_RE.findall(tags)
     
     with col3:
-        if st.session_state.frontmatter['title']:
-            complete_post = f"""---
-{yaml.dump(st.session_state.frontmatter, allow_unicode=True, sort_keys=False)}---
-
-{st.session_state.content}"""
-            filename = re.sub(r'[^a-z0-9]+', '-', title.lower()) + '.md'
-            st.download_button("📥 Export", complete_post, filename, 
+        if st.session_state.fm_title:
+            # The chunk list is only ever changed in place, so edits made inside
+            # the editor fragment after this run are still exported
+            export = partial(export_post, session_frontmatter(), st.session_state.content_chunks)
+            filename = slugify(title) + '.md'
+            st.download_button("📥 Export", export, filename, 
                              "text/markdown", use_container_width=True)
 
-    # Main editor and preview
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        create_editor()
+    if st.session_state.image_dialog:
+        show_image_dialog(st.session_state.image_dialog)
 
-    with col2:
-        st.markdown("### Preview")
-        st.markdown(convert_markdown(st.session_state.content), unsafe_allow_html=True)
+    # Main editor and preview
+    editor_and_preview()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,109 @@
+import pytest
+
+import utils
+from utils import generate_frontmatter, render_blocks, render_markdown, slugify, split_blocks
+
+SAMPLES = [
+    '',
+    'Plain title',
+    'Colon: "double" \'single\' #hash',
+    '- leading dash',
+    'yes',
+    '1.0',
+    'Ünïcødé 😀',
+    'back\\slash\ttab\nnewline',
+    # Characters JSON leaves unescaped that YAML rejects or folds
+    '\x7f \x85 \x9f \u2028 \u2029 \ud800 \ufffe \uffff',
+]
+
+def load_frontmatter(text):
+    """Parse the YAML between the frontmatter fences"""
+    yaml = pytest.importorskip('yaml')
+    assert text.startswith('---\n') and text.endswith('\n---\n')
+    return yaml.safe_load(text[4:-4])
+
+@pytest.mark.parametrize('value', SAMPLES)
+def test_frontmatter_round_trips(value):
+    text = generate_frontmatter(value, value, '2025-01-09', (value, 'tag'), value, value)
+    assert load_frontmatter(text) == {
+        'title': value,
+        'excerpt': value,
+        'publishDate': '2025-01-09',
+        'tags': [value, 'tag'],
+        'seo': {'image': {'src': value, 'alt': value}}
+    }
+
+def test_frontmatter_without_tags():
+    text = generate_frontmatter('Title', '', '2025-01-09', (), '', '')
+    assert 'tags: []\n' in text
+    assert load_frontmatter(text)['tags'] == []
+
+@pytest.mark.skipif(utils.pyromark is None, reason='python-markdown handles nl2br itself')
+@pytest.mark.parametrize('content, html', [
+    ('a\nb', '<p>a<br />\nb</p>\n'),
+    ('> q\n> r', '<blockquote>\n<p>q<br />\nr</p>\n</blockquote>\n'),
+    ('Intro\n\n    one\n    two', '<p>Intro</p>\n<pre><code>one\ntwo</code></pre>\n'),
+    ('```\none\ntwo\n```', '<pre><code>one\ntwo\n</code></pre>\n'),
+    ('<pre>\none\ntwo\n</pre>', '<pre>\none\ntwo\n</pre>'),
+])
+def test_hard_line_breaks_only_in_text(content, html):
+    assert render_markdown(content) == html
+
+DOCUMENTS = [
+    '',
+    'single line',
+    '# Title\n\nPara one\nline two\n\nLast para\n',
+    '\n\nleading blank lines\n\n\n',
+    '```python\na = 1\n\nb = 2\n```\n\nafter',
+    '```\n```python\ninside\n\nstill\n```\n\nafter',
+    '~~~\n~~~ not a close\n\nx\n~~~\n\np',
+    'Intro\n\n    code one\n\n    code two\n\nafter',
+    '- item one\n\n  continued para\n\n- item two',
+    '- one\n\n- two\n\npara',
+    '1. a\n\n2. b',
+    'Steps:\n- one\n\n- two',
+    '# Steps\n- one\n\n- two',
+    'Term\n: def\n\nTerm2\n: def2',
+    'Term\n\n: def',
+    'Term\n: def\n\n: def2\n\npara',
+    '> quote\n\n> another',
+    '| a | b |\n|---|---|\n| 1 | 2 |\n\nafter',
+    '<div>\n\ninside\n\n</div>\n\npara',
+    '<details>\n<summary>S</summary>\n\nbody *x*\n\n</details>\n\nnext',
+    'Text with <br> and <img src="x">\n\nsecond',
+    'Use `<div>` here\n\nnext\n\nthird',
+    '<!-- a comment\n\nover blank lines -->\n\npara',
+    '<!-- short --> text\n\nnext',
+    utils.article_figure('a.jpg', 'alt', 'a <b>caption</b>', 'Source', 'https://example.com') + 'after',
+    'See [the docs][docs].\n\n[docs]: https://example.com',
+]
+
+@pytest.mark.parametrize('content', DOCUMENTS)
+def test_blocks_render_like_the_whole_document(content):
+    assert ''.join(render_blocks(content, {})) == render_markdown(content)
+
+def test_split_blocks_keeps_lists_together():
+    assert split_blocks('Steps:\n- one\n\n- two\n\npara') == ['Steps:\n- one\n\n- two\n', 'para']
+
+def test_split_blocks_ignores_tags_in_code_spans():
+    assert len(split_blocks('Use `<div>` here\n\nnext\n\nthird')) == 3
+
+def test_split_blocks_keeps_comments_together():
+    assert split_blocks('<!-- a\n\nb -->\n\npara') == ['<!-- a\n\nb -->\n', 'para']
+
+def test_render_blocks_reuses_unchanged_blocks():
+    cache = {}
+    render_blocks('# Title\n\npara', cache)
+    cached = dict(cache)
+    render_blocks('# Title\n\npara edited', cache)
+    assert set(cached) < set(cache)
+
+@pytest.mark.parametrize('title, slug', [
+    ('Hello "World", it\'s me!', 'hello-world-its-me'),
+    ('  Spaces -- and dashes  ', 'spaces-and-dashes'),
+    ('ÄÖÜ', 'post'),
+    ('日本語のタイトル', 'post'),
+    ('!!!', 'post'),
+])
+def test_slugify(title, slug):
+    assert slugify(title) == slug
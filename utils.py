@@ -0,0 +1,333 @@
+import re
+import hashlib
+import functools
+import itertools
+import string
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from html import escape, unescape
+
+# Optional accelerators, resolved once; both have pure-Python fallbacks
+try:
+    import pyromark
+except ImportError:
+    pyromark = None
+try:
+    from xxhash import xxh3_128_digest
+except ImportError:
+    xxh3_128_digest = None
+
+# Only used by the python-markdown fallback when pyromark is not installed
+MARKDOWN_EXTENSIONS = [
+    'markdown.extensions.extra',
+    'markdown.extensions.nl2br',
+    'markdown.extensions.sane_lists',
+    'markdown.extensions.smarty'
+]
+# Regexes are compiled once at import; add new patterns here rather than inline
+FENCE_RE = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+# A closing fence can't carry an info string
+CLOSING_FENCE_RE = re.compile(r'^ {0,3}(`{3,}|~{3,})[ \t]*$')
+HTML_TAG_RE = re.compile(r'<(/?)([A-Za-z][A-Za-z0-9-]*)\b[^>]*?(/?)>')
+HTML_COMMENT_RE = re.compile(r'<!--.*?-->')
+CODE_SPAN_RE = re.compile(r'(`+).+?\1')
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr'
+])
+LIST_ITEM_RE = re.compile(r'^ {0,3}(?:[-+*]|\d{1,9}[.)])(?:\s|$)')
+DEFINITION_RE = re.compile(r'^ {0,3}:[ \t]')
+REFERENCE_RE = re.compile(r'^ {0,3}\[[^\]]+\]:', re.MULTILINE)
+HYPHEN_RUN_RE = re.compile(r'-{2,}')
+# A comma-separated tag with surrounding whitespace trimmed
+TAG_RE = re.compile(r'[^,\s](?:[^,]*[^,\s])?')
+QUOTE_TABLE = str.maketrans('', '', '"\'')
+# Characters JSON leaves raw that YAML rejects or reads as line breaks
+YAML_ESCAPES = {
+    char: f'\\u{char:04x}'
+    for char in [*range(0x7f, 0xa0), 0x2028, 0x2029, *range(0xd800, 0xe000), 0xfffe, 0xffff]
+}
+# Byte table keeping a-z and 0-9 and mapping every other byte to '-'
+SLUG_TABLE = bytes(
+    byte if chr(byte) in string.ascii_lowercase + string.digits else ord('-')
+    for byte in range(256)
+)
+IMG_TAG_RE = re.compile(r'<img\b([^>]*)>', re.IGNORECASE)
+LINK_RE = re.compile(r'<a\b([^>]*)>(.*?)</a>', re.IGNORECASE | re.DOTALL)
+ATTR_RE = re.compile(r'\s([\w-]+)\s*=\s*"([^"]*)"')
+BLOCK_CACHE_SIZE = 256
+PYROMARK_OPTIONS = pyromark and (
+    pyromark.Options.ENABLE_TABLES
+    | pyromark.Options.ENABLE_FOOTNOTES
+    | pyromark.Options.ENABLE_DEFINITION_LIST
+    | pyromark.Options.ENABLE_HEADING_ATTRIBUTES
+    | pyromark.Options.ENABLE_SMART_PUNCTUATION
+)
+
+COVER_FIGURE = """<figure>
+  <img id="cover-img" src="{src}" alt="{alt}">
+  <figcaption>Photo by <a href="{photographer_url}">{photographer}</a> on <a href="{source_url}">Unsplash</a></figcaption>
+</figure>\n\n"""
+ARTICLE_FIGURE = """<figure>
+  <img id="article-img" src="{path}" alt="{alt}">
+  <figcaption>"{caption}" \\ Source: <a href="{url}" target="_blank">{source}</a>{author_text}</figcaption>
+</figure>\n\n"""
+
+# Module state survives reruns, since Streamlit only re-executes app.py
+RENDER_POOL = ThreadPoolExecutor(max_workers=2)
+MARKDOWN_PARSERS = threading.local()
+
+def unsplash_data(src, alt, photographer, photographer_href, source_href):
+    """Build the image data, adding Unsplash's referral parameters to bare links"""
+    utm_params = '?utm_content=creditCopyText&utm_medium=referral&utm_source=unsplash'
+    
+    return {
+        'src': src,
+        'alt': alt,
+        'photographer': photographer,
+        'photographer_url': photographer_href + ('' if '?' in photographer_href else utm_params),
+        'source_url': source_href + ('' if '?' in source_href else utm_params)
+    }
+
+def parse_unsplash_soup(html_content):
+    """BeautifulSoup version of parse_unsplash_html, used without selectolax"""
+    from bs4 import BeautifulSoup
+    
+    soup = BeautifulSoup(html_content, 'lxml')
+    img = soup.find('img')
+    links = soup.find_all('a', limit=2)
+    
+    if not (img and len(links) >= 2):
+        return None
+    
+    # Index the plain attrs dicts rather than going through Tag.__getitem__
+    img_attrs = img.attrs
+    return unsplash_data(img_attrs['src'], img_attrs.get('alt', ''), links[0].text,
+                         links[0].attrs['href'], links[1].attrs['href'])
+
+def tag_attributes(attrs):
+    """Parse a tag's attributes, None unless they are all double-quoted"""
+    if '=' in ATTR_RE.sub('', attrs):
+        return None
+    return {name.lower(): unescape(value) for name, value in ATTR_RE.findall(attrs)}
+
+def match_unsplash_html(html_content):
+    """Regex fast path for parse_unsplash_html, None when the markup needs a parser"""
+    img = IMG_TAG_RE.search(html_content)
+    links = list(itertools.islice(LINK_RE.finditer(html_content), 2))
+    if not img or len(links) < 2 or '<' in links[0].group(2):
+        return None
+    
+    img_attrs = tag_attributes(img.group(1))
+    first, second = tag_attributes(links[0].group(1)), tag_attributes(links[1].group(1))
+    if not (img_attrs and 'src' in img_attrs and first and 'href' in first and second and 'href' in second):
+        return None
+    
+    return unsplash_data(img_attrs['src'], img_attrs.get('alt', ''), unescape(links[0].group(2)),
+                         first['href'], second['href'])
+
+def parse_unsplash_html(html_content: str):
+    """Parse Unsplash HTML and extract relevant information"""
+    # Surrounding whitespace from the paste shouldn't miss the cache
+    return parse_unsplash_html_cached(html_content.strip())
+
+@functools.lru_cache(maxsize=32)
+def parse_unsplash_html_cached(html_content):
+    """Cached worker for parse_unsplash_html; the result is shared, don't mutate it"""
+    try:
+        data = match_unsplash_html(html_content)
+        if data:
+            return data
+        
+        try:
+            from selectolax.parser import HTMLParser
+        except ImportError:
+            return parse_unsplash_soup(html_content)
+        
+        tree = HTMLParser(html_content)
+        img = tree.css_first('img')
+        links = tree.css('a')
+        
+        if not (img and len(links) >= 2):
+            return None
+        
+        return unsplash_data(img.attributes['src'], img.attributes.get('alt') or '', links[0].text(),
+                             links[0].attributes['href'], links[1].attributes['href'])
+    except Exception:
+        return None
+
+def hard_line_breaks(content):
+    """Turn pyromark's soft line breaks into hard breaks (nl2br)"""
+    # Break positions come from the parser itself, so code and raw HTML keep their lines
+    events = pyromark.events_with_range(content, options=PYROMARK_OPTIONS)
+    breaks = [span['start'] for event, span in events if event == 'SoftBreak']
+    if not breaks:
+        return content
+    
+    # Ranges are byte offsets into the UTF-8 source
+    source = content.encode()
+    parts = [source[start:end] for start, end in zip([0, *breaks], [*breaks, len(source)])]
+    return b'  '.join(parts).decode()
+
+def markdown_parser():
+    """Return this thread's python-markdown parser, building it once"""
+    if not hasattr(MARKDOWN_PARSERS, 'md'):
+        import markdown
+        MARKDOWN_PARSERS.md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+    return MARKDOWN_PARSERS.md
+
+def render_markdown(content):
+    """Render markdown to HTML"""
+    if pyromark is None:
+        # Reusing the parser skips rebuilding the extensions on every call
+        return markdown_parser().reset().convert(content)
+    return pyromark.html(hard_line_breaks(content), options=PYROMARK_OPTIONS)
+
+def html_depth(line):
+    """Net number of HTML elements a line leaves open, and whether it opens a comment"""
+    # Tags in code spans and finished comments are text, not open elements
+    line = HTML_COMMENT_RE.sub('', CODE_SPAN_RE.sub('', line))
+    line, comment, _ = line.partition('<!--')
+    depth = 0
+    for closing, name, self_closing in HTML_TAG_RE.findall(line):
+        if not (self_closing or name.lower() in VOID_ELEMENTS):
+            depth += -1 if closing else 1
+    return depth, bool(comment)
+
+def next_is_definition(lines, start):
+    """Whether the next non-blank line from start opens a definition"""
+    for line in itertools.islice(lines, start, None):
+        if line.strip():
+            return bool(DEFINITION_RE.match(line))
+    return False
+
+def split_blocks(content):
+    """Split markdown into top-level blocks at blank lines outside fenced code, lists and HTML"""
+    blocks, current = [], []
+    lines = content.split('\n')
+    fence = None
+    blank = False
+    # Whether the current block has reached a list or definition list, which
+    # items after a blank line carry on
+    in_list = in_definitions = False
+    # Elements left open by the current block; a miscount only merges blocks
+    depth = 0
+    comment = False
+    
+    for i, line in enumerate(lines):
+        if fence:
+            closing = CLOSING_FENCE_RE.match(line)
+            if closing and closing.group(1)[0] == fence[0] and len(closing.group(1)) >= len(fence):
+                fence = None
+        elif comment:
+            # An HTML comment runs across blank lines until its -->
+            if '-->' in line:
+                opened, comment = html_depth(line.split('-->', 1)[1])
+                depth = max(depth + opened, 0)
+        elif not line.strip():
+            if not current:
+                continue
+            blank = True
+        else:
+            # Indented lines, further list items or definitions and the inside
+            # of an open HTML element belong to the previous block
+            continues = blank and (
+                depth or line[0] in ' \t' or DEFINITION_RE.match(line)
+                or (in_list and LIST_ITEM_RE.match(line))
+                or (in_definitions and next_is_definition(lines, i + 1))
+            )
+            if blank and not continues:
+                # Keep the newline, so raw HTML renders as it does mid-document
+                blocks.append('\n'.join(current).strip('\n') + '\n')
+                current = []
+                in_list = in_definitions = False
+            blank = False
+            match = FENCE_RE.match(line)
+            if match:
+                fence = match.group(1)
+            elif LIST_ITEM_RE.match(line):
+                in_list = True
+            elif DEFINITION_RE.match(line):
+                in_definitions = True
+            if '<' in line and not match:
+                opened, comment = html_depth(line)
+                depth = max(depth + opened, 0)
+        current.append(line)
+    
+    if current:
+        blocks.append('\n'.join(current).lstrip('\n'))
+    return blocks
+
+if xxh3_128_digest:
+    block_digest = xxh3_128_digest
+else:
+    def block_digest(data: bytes) -> bytes:
+        """Hash a block's source for the block cache"""
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+def render_blocks(content, cache):
+    """Render markdown block by block, reusing cached HTML for unchanged blocks"""
+    if not content.strip():
+        return []
+    # Link references and footnotes span blocks, so render those documents whole
+    blocks = [content] if REFERENCE_RE.search(content) else split_blocks(content)
+    
+    parts = []
+    for block in blocks:
+        key = block_digest(block.encode())
+        html = cache.pop(key, None)
+        if html is None:
+            html = render_markdown(block)
+        cache[key] = html
+        parts.append(html)
+    
+    # Evict the least recently used blocks
+    while len(cache) > BLOCK_CACHE_SIZE:
+        del cache[next(iter(cache))]
+    
+    return parts
+
+def yaml_string(value):
+    """Quote a string as a YAML scalar"""
+    # A JSON string is a valid YAML double-quoted scalar
+    return json.dumps(value, ensure_ascii=False).translate(YAML_ESCAPES)
+
+def generate_frontmatter(title: str, excerpt: str, publish_date: str, tags: tuple,
+                         image_src: str, image_alt: str) -> str:
+    """Generate the YAML frontmatter block for the post"""
+    tag_list = ''.join(f"\n  - {yaml_string(tag)}" for tag in tags) or ' []'
+    return f"""---
+title: {yaml_string(title)}
+excerpt: {yaml_string(excerpt)}
+publishDate: '{publish_date}'
+tags:{tag_list}
+seo:
+  image:
+    src: {yaml_string(image_src)}
+    alt: {yaml_string(image_alt)}
+---
+"""
+
+@functools.lru_cache(maxsize=256)
+def slugify(text):
+    """Turn a post title into a filename slug"""
+    # Non-ASCII characters become '?', then '-', like any other separator
+    slug = text.translate(QUOTE_TABLE).lower().encode('ascii', 'replace').translate(SLUG_TABLE)
+    # Titles without ASCII letters or digits still need a usable filename
+    return HYPHEN_RUN_RE.sub('-', slug.decode('ascii')).strip('-') or 'post'
+
+def cover_figure(data):
+    """Figure HTML for an Unsplash cover image"""
+    return COVER_FIGURE.format_map({key: escape(value) for key, value in data.items()})
+
+def article_figure(path, alt, caption, source, url, author=''):
+    """Figure HTML for an article image credited to its source"""
+    return ARTICLE_FIGURE.format_map({
+        'path': escape(path),
+        'alt': escape(alt),
+        'caption': escape(caption),
+        'source': escape(source),
+        'url': escape(url),
+        'author_text': f", by {escape(author)}" if author else ""
+    })